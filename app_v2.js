@@ -35,6 +35,7 @@ document.addEventListener('DOMContentLoaded', () => {
     
     setupEventListeners();
     checkPythonServer();
+    restoreLastResult();
 });
 
 /**
@@ -89,6 +90,31 @@ async function checkPythonServer() {
     }
 }
 
+/**
+ * Recarrega o último resultado da sessão (GET /results/<id>).
+ * O navegador revalida com If-None-Match e o servidor responde 304 se nada mudou.
+ */
+async function restoreLastResult() {
+    const resultId = sessionStorage.getItem('lastResultId');
+    if (!resultId) return;
+    
+    try {
+        const response = await fetch(`${API_BASE_URL}/results/${encodeURIComponent(resultId)}`);
+        if (!response.ok) {
+            // Resultado expirou do cache do servidor
+            sessionStorage.removeItem('lastResultId');
+            return;
+        }
+        
+        const result = await response.json();
+        console.log('♻️ Resultado anterior restaurado:', resultId);
+        processData(result);
+        showStatus('Último arquivo processado restaurado', 'success');
+    } catch (e) {
+        console.warn('⚠️ Não foi possível restaurar o último resultado:', e);
+    }
+}
+
 /**
  * Atualiza as informações da empresa no cabeçalho
  */
@@ -179,6 +205,13 @@ async function handleFileUpload(file) {
         // Processar dados (passar o resultado completo, não só result.data)
         processData(result);
         
+        // resultId só vem quando o cache de resultados está ligado no servidor
+        if (result.resultId) {
+            sessionStorage.setItem('lastResultId', result.resultId);
+        } else {
+            sessionStorage.removeItem('lastResultId');
+        }
+        
         showStatus('Arquivo processado com sucesso!', 'success');
         
     } catch (error) {
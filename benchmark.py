@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+═══════════════════════════════════════════════════════════════════════════════
+BENCHMARK - ESTRUTURAÇÃO DE FOLHA E ENGINES DE LEITURA
+═══════════════════════════════════════════════════════════════════════════════
+
+Mede, em folhas sintéticas (payroll_generator.py):
+✓ Estruturação (server.structure_payroll_data): tempo, pico de memória alocada
+  (tracemalloc) e custo médio por evento
+✓ Engines de leitura (--engines): tempo de cada engine disponível nas mesmas
+  planilhas, conferindo que todos produzem a mesma grade. São geradas .xlsx e
+  .csv só com texto e uma .xlsx tipada (números, datas, horas e durações);
+  os engines de .xls só são comparados em arquivos passados em --files
+
+USO:
+    python benchmark.py
+    python benchmark.py --employees 500,2000,5000 --repeat 3
+    python benchmark.py --engines --employees 500,2000 --files antigo.xls
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+from payroll_generator import generate_payroll_rows, write_payroll
+import server
+
+
+def run_quiet(func, *args):
+    """Executa sem os prints de depuração do servidor (não distorcem a medição)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def bench_structuring(raw_data: List[List[str]], repeat: int) -> Dict:
+    """
+    Melhor tempo em `repeat` execuções + pico de memória de uma execução
+    """
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        structured = run_quiet(server.structure_payroll_data, raw_data)
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    structured = run_quiet(server.structure_payroll_data, raw_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    events = structured['summary']['total_events']
+    return {
+        'seconds': min(timings),
+        'peakBytes': peak,
+        'events': events,
+        'bytesPerEvent': peak / events if events else 0
+    }
+
+
+def bench_engines(path: str, repeat: int):
+    """
+    Tempo de leitura de um arquivo por cada engine disponível para a extensão
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    engines = [e for e in server.READER_ENGINES.values() if extension in e.extensions and e.available()]
+    missing = [e.name for e in server.READER_ENGINES.values() if extension in e.extensions and not e.available()]
+
+    print(f'\n📄 {os.path.basename(path)} ({os.path.getsize(path) / 2**20:.1f}MB)')
+    if missing:
+        print(f'   (não instalados: {", ".join(missing)})')
+
+    reference = None
+    for engine in engines:
+        timings = []
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            grid = run_quiet(server.read_spreadsheet, engine, path)
+            timings.append(time.perf_counter() - started)
+
+        if reference is None:
+            reference = grid
+        same = 'igual' if grid == reference else 'DIFERENTE'
+        print(f'   {engine.name:>10} {min(timings):>8.3f}s {len(grid):>8} linhas  {same}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da estruturação de folha e dos engines de leitura')
+    parser.add_argument('--employees', default='500,2000,5000', help='Tamanhos separados por vírgula')
+    parser.add_argument('--references', default='01/2025,02/2025,03/2025,04/2025,05/2025,06/2025')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--engines', action='store_true', help='Compara os engines de leitura')
+    parser.add_argument('--files', nargs='*', default=[], help='Planilhas extras para --engines (ex.: .xls)')
+    args = parser.parse_args()
+
+    references = args.references.split(',')
+
+    if args.engines:
+        print('═' * 80)
+        print('📑 ENGINES DE LEITURA')
+        print('═' * 80)
+        with tempfile.TemporaryDirectory() as workdir:
+            for employees in (int(n) for n in args.employees.split(',')):
+                for suffix, typed in (('.xlsx', False), ('.csv', False), ('_tipada.xlsx', True)):
+                    path = os.path.join(workdir, f'folha_{employees}{suffix}')
+                    write_payroll(generate_payroll_rows(employees=employees, references=references, typed=typed), path)
+                    bench_engines(path, args.repeat)
+        for path in args.files:
+            bench_engines(path, args.repeat)
+        return
+
+    print('═' * 80)
+    print('⏱️  ESTRUTURAÇÃO (structure_payroll_data)')
+    print('═' * 80)
+    print(f'{"funcionários":>13} {"eventos":>9} {"tempo (s)":>10} {"pico (MB)":>10} {"bytes/evento":>13}')
+
+    for employees in (int(n) for n in args.employees.split(',')):
+        raw_data = generate_payroll_rows(employees=employees, references=references)
+        result = bench_structuring(raw_data, args.repeat)
+        print(f'{employees:>13} {result["events"]:>9} {result["seconds"]:>10.3f} '
+              f'{result["peakBytes"] / 2**20:>10.1f} {result["bytesPerEvent"]:>13.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+═══════════════════════════════════════════════════════════════════════════════
+TESTE DE CARGA - POST /parse-excel
+═══════════════════════════════════════════════════════════════════════════════
+
+Simula vários contadores enviando folhas ao mesmo tempo contra uma instância
+em execução (local ou Docker) e reporta:
+✓ Vazão (requisições/s)
+✓ Latência p50 / p95 / p99 (com --rate, medida a partir do horário agendado,
+  incluindo a espera por um slot livre; o tempo de serviço puro sai à parte)
+✓ Taxa de erro por errorCode
+✓ RSS máximo do servidor durante o teste (amostrado via GET /metrics)
+
+Pode comparar o resultado com um baseline salvo e falhar (exit 1) em caso de
+regressão — útil antes de cada deploy.
+
+USO:
+    python loadtest.py --url http://localhost:5001 --concurrency 20 --requests 200
+    python loadtest.py --save-baseline loadtest_baseline.json
+    python loadtest.py --baseline loadtest_baseline.json --tolerance 0.2
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from payroll_generator import generate_payroll_rows, write_payroll
+
+CONTENT_TYPES = {
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.xls': 'application/vnd.ms-excel',
+    '.csv': 'text/csv'
+}
+
+
+def build_payloads(mix: List[Tuple[int, str]], workdir: str) -> List[Tuple[str, bytes]]:
+    """
+    Gera os arquivos do mix (funcionários, extensão) e carrega em memória
+    """
+
+    payloads = []
+    for idx, (employees, extension) in enumerate(mix):
+        path = os.path.join(workdir, f'folha_{employees}{extension}')
+        write_payroll(generate_payroll_rows(employees=employees, seed=idx), path)
+        with open(path, 'rb') as f:
+            payloads.append((os.path.basename(path), f.read()))
+        print(f'  📄 {os.path.basename(path)}: {len(payloads[-1][1]):,} bytes')
+    return payloads
+
+
+def encode_multipart(filename: str, content: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    extension = os.path.splitext(filename)[1].lower()
+    head = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: {CONTENT_TYPES.get(extension, "application/octet-stream")}\r\n\r\n'
+    ).encode()
+    tail = f'\r\n--{boundary}--\r\n'.encode()
+    return head + content + tail, f'multipart/form-data; boundary={boundary}'
+
+
+def send_upload(url: str, filename: str, content: bytes, timeout: float) -> Tuple[float, str]:
+    """
+    Envia um arquivo e retorna (latência em segundos, errorCode ou 'OK')
+    """
+
+    body, content_type = encode_multipart(filename, content)
+    req = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': content_type})
+
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+        return time.perf_counter() - started, 'OK'
+    except urllib.error.HTTPError as e:
+        payload = e.read()
+        elapsed = time.perf_counter() - started
+        try:
+            code = json.loads(payload).get('errorCode') or f'HTTP_{e.code}'
+        except ValueError:
+            code = f'HTTP_{e.code}'
+        return elapsed, code
+    except Exception as e:
+        return time.perf_counter() - started, f'CONNECTION_ERROR:{type(e).__name__}'
+
+
+def fetch_metrics(base_url: str) -> Optional[Dict]:
+    try:
+        with urllib.request.urlopen(f'{base_url}/metrics', timeout=5) as resp:
+            return json.loads(resp.read())
+    except Exception:
+        return None
+
+
+class RssPoller:
+    """
+    Consulta /metrics periodicamente e guarda o maior RSS observado
+    """
+
+    def __init__(self, base_url: str, interval: float = 0.5):
+        self.base_url = base_url
+        self.interval = interval
+        self.max_rss = None
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _sample(self):
+        data = fetch_metrics(self.base_url)
+        if not data:
+            return
+        if data.get('rssBytes') is not None:
+            self.max_rss = max(self.max_rss or 0, data['rssBytes'])
+        if data.get('peakRssBytes') is not None:
+            self.peak_rss = data['peakRssBytes']
+
+    def _run(self):
+        self._sample()
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil pelo método nearest-rank"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_load(args, payloads: List[Tuple[str, bytes]]) -> Dict:
+    base_url = args.url.rstrip('/')
+    url = f'{base_url}/parse-excel'
+    results = []
+    results_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def worker(i: int):
+        # Agenda a requisição i em i/rate segundos (rate=0 → sem limite).
+        # A latência conta a partir do horário agendado: se todos os slots
+        # estavam ocupados, o atraso entra na medida (evita coordinated omission)
+        scheduled = None
+        if args.rate > 0:
+            scheduled = started + i / args.rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        filename, content = payloads[i % len(payloads)]
+        service_time, code = send_upload(url, filename, content, args.timeout)
+        latency = time.perf_counter() - scheduled if scheduled is not None else service_time
+        with results_lock:
+            results.append((latency, service_time, code))
+
+    poller = RssPoller(base_url)
+    poller.start()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    poller.stop()
+
+    latencies = sorted(lat for lat, _, code in results if code == 'OK')
+    service_times = sorted(svc for _, svc, code in results if code == 'OK')
+    codes = Counter(code for _, _, code in results)
+    errors = {code: n for code, n in codes.items() if code != 'OK'}
+    total = len(results)
+
+    return {
+        'requests': total,
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'durationSeconds': round(elapsed, 3),
+        'throughputRps': round(codes['OK'] / elapsed, 3) if elapsed else 0.0,
+        'latencyMs': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1) if latencies else 0.0
+        },
+        'serviceTimeMs': {
+            'p50': round(percentile(service_times, 50) * 1000, 1),
+            'p95': round(percentile(service_times, 95) * 1000, 1),
+            'p99': round(percentile(service_times, 99) * 1000, 1),
+            'max': round(service_times[-1] * 1000, 1) if service_times else 0.0
+        },
+        'errorRate': round(sum(errors.values()) / total, 4) if total else 0.0,
+        'errorsByCode': errors,
+        'serverMaxRssBytes': poller.max_rss,
+        'serverPeakRssBytes': poller.peak_rss
+    }
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float, error_margin: float) -> List[str]:
+    """
+    Lista as regressões em relação ao baseline (vazia = aprovado)
+    """
+
+    failures = []
+
+    if report['throughputRps'] < baseline['throughputRps'] * (1 - tolerance):
+        failures.append(f"vazão {report['throughputRps']} < {baseline['throughputRps']} req/s")
+
+    for key in ('p50', 'p95', 'p99'):
+        current, reference = report['latencyMs'][key], baseline['latencyMs'][key]
+        if reference and current > reference * (1 + tolerance):
+            failures.append(f'latência {key} {current}ms > {reference}ms')
+
+    if report['errorRate'] > baseline['errorRate'] + error_margin:
+        failures.append(f"taxa de erro {report['errorRate']:.2%} > {baseline['errorRate']:.2%}")
+
+    # Só o RSS amostrado durante o teste: o pico do processo (ru_maxrss) inclui
+    # arquivos processados antes e não serve para comparar execuções
+    current_rss = report.get('serverMaxRssBytes')
+    reference_rss = baseline.get('serverMaxRssBytes')
+    if current_rss and reference_rss and current_rss > reference_rss * (1 + tolerance):
+        failures.append(f'RSS máximo {current_rss / 2**20:.0f}MB > {reference_rss / 2**20:.0f}MB')
+
+    return failures
+
+
+def parse_mix(value: str) -> List[Tuple[int, str]]:
+    """'20:xlsx,200:xlsx,50:csv' → [(20, '.xlsx'), (200, '.xlsx'), (50, '.csv')]"""
+    mix = []
+    for item in value.split(','):
+        employees, _, extension = item.strip().partition(':')
+        mix.append((int(employees), '.' + (extension or 'xlsx').lstrip('.')))
+    return mix
+
+
+def print_report(report: Dict):
+    print('\n' + '═' * 80)
+    print('📊 RESULTADO')
+    print('═' * 80)
+    print(f"   📨 Requisições: {report['requests']} (concorrência {report['concurrency']})")
+    print(f"   ⏱️  Duração: {report['durationSeconds']}s")
+    print(f"   🚀 Vazão: {report['throughputRps']} req/s")
+    lat = report['latencyMs']
+    print(f"   📈 Latência: p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms max={lat['max']}ms")
+    if report['rate'] > 0:
+        svc = report['serviceTimeMs']
+        print(f"   🛠️  Serviço: p50={svc['p50']}ms p95={svc['p95']}ms p99={svc['p99']}ms max={svc['max']}ms"
+              f" (sem a espera por slot)")
+    print(f"   ❌ Taxa de erro: {report['errorRate']:.2%} {report['errorsByCode'] or ''}")
+    if report['serverPeakRssBytes'] or report['serverMaxRssBytes']:
+        print(f"   💾 RSS servidor: máx durante o teste {(report['serverMaxRssBytes'] or 0) / 2**20:.0f}MB"
+              f" | pico desde o início do processo {(report['serverPeakRssBytes'] or 0) / 2**20:.0f}MB")
+    else:
+        print('   💾 RSS servidor: indisponível (GET /metrics falhou)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do POST /parse-excel')
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=0, help='Requisições/s no total (0 = sem limite)')
+    parser.add_argument('--mix', default='20:xlsx,200:xlsx,1000:xlsx,200:csv',
+                        help='Arquivos gerados: FUNCIONARIOS:EXTENSAO separados por vírgula')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', help='Grava o relatório em JSON')
+    parser.add_argument('--baseline', help='Compara com um baseline salvo e falha em regressão')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Tolerância relativa (0.15 = 15%%)')
+    parser.add_argument('--error-margin', type=float, default=0.01,
+                        help='Aumento absoluto aceito na taxa de erro (0.01 = 1 ponto percentual)')
+    parser.add_argument('--save-baseline', help='Grava o resultado como novo baseline')
+    args = parser.parse_args()
+
+    if args.baseline and os.path.abspath(args.baseline) in {
+            os.path.abspath(p) for p in (args.output, args.save_baseline) if p}:
+        parser.error('--baseline não pode ser o mesmo arquivo de --output/--save-baseline')
+
+    # Lido antes do teste: o baseline comparado é sempre o anterior à execução
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print('═' * 80)
+    print(f'🧪 TESTE DE CARGA: {args.url}')
+    print('═' * 80)
+
+    if fetch_metrics(args.url.rstrip('/')) is None:
+        print(f'⚠️  {args.url}/metrics não respondeu — o servidor está rodando?')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        payloads = build_payloads(parse_mix(args.mix), workdir)
+
+    report = run_load(args, payloads)
+    print_report(report)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'\n💾 Relatório gravado em {path}')
+
+    if baseline is not None:
+        failures = compare_with_baseline(report, baseline, args.tolerance, args.error_margin)
+        if failures:
+            print(f'\n❌ REGRESSÃO em relação a {args.baseline}:')
+            for failure in failures:
+                print(f'   • {failure}')
+            sys.exit(1)
+        print(f'\n✅ Dentro do baseline ({args.baseline}, tolerância {args.tolerance:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+═══════════════════════════════════════════════════════════════════════════════
+GERADOR DE FOLHAS DE PAGAMENTO SINTÉTICAS
+═══════════════════════════════════════════════════════════════════════════════
+
+Gera planilhas no mesmo layout esperado pelo server.py (cabeçalho da empresa,
+linhas "ID - NOME" e eventos nas colunas 0/4/17/20/23/24), para testes de carga
+e benchmarks. Nenhum dado real de cliente é usado.
+
+USO:
+    python payroll_generator.py --employees 500 --output folha.xlsx
+    python payroll_generator.py --employees 500 --typed --output folha_tipada.xlsx
+═══════════════════════════════════════════════════════════════════════════════
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import random
+from typing import Any, List, Sequence
+
+from openpyxl import Workbook
+
+ROW_WIDTH = 26
+DEFAULT_REFERENCES = ('10/2025', '11/2025')
+
+EVENT_NAMES = [
+    'HORAS NORMAIS', 'HORAS EXTRAS 50%', 'HORAS EXTRAS 100%', 'ADICIONAL NOTURNO',
+    'DSR SOBRE HORAS EXTRAS', 'INSALUBRIDADE', 'PERICULOSIDADE', 'GRATIFICAÇÃO',
+    'COMISSÕES', 'SALÁRIO FAMÍLIA', 'INSS', 'IRRF', 'VALE TRANSPORTE',
+    'VALE REFEIÇÃO', 'PLANO DE SAÚDE', 'FALTAS', 'ADIANTAMENTO', 'CONTRIBUIÇÃO SINDICAL'
+]
+
+FIRST_NAMES = ['ALEX', 'MARIA', 'JOÃO', 'ANA', 'CARLOS', 'JULIANA', 'PEDRO', 'FERNANDA', 'LUCAS', 'PATRÍCIA']
+LAST_NAMES = ['SILVA', 'SOUZA', 'OLIVEIRA', 'SANTOS', 'PEREIRA', 'BARBOZA DE MELO', 'COSTA', 'RODRIGUES']
+
+
+def format_brl(value: float) -> str:
+    """4077.32 → '4.077,32'"""
+    return f'{value:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def generate_payroll_rows(
+    employees: int = 100,
+    events_per_employee: int = 14,
+    references: Sequence[str] = DEFAULT_REFERENCES,
+    seed: int = 42,
+    typed: bool = False
+) -> List[List[Any]]:
+    """
+    Gera a tabela (lista de linhas) de uma folha sintética.
+    Com typed=True, códigos, valores, horas e datas saem como células nativas
+    (int, float, timedelta, datetime/date/time) em vez de texto — só .xlsx
+    """
+
+    rng = random.Random(seed)
+    events_per_employee = min(events_per_employee, len(EVENT_NAMES))
+
+    rows = [
+        ['Empresa:', '', '', '', '1 - EMPRESA EXEMPLO LTDA'],
+        ['CNPJ:', '12.345.678/0001-90'],
+        ['Competência:'] + list(references),
+        ['Código', '', '', '', 'Descrição'] + [''] * 12 + ['Referência', '', '', 'Calculado', '', '', 'Informado', 'Tipo']
+    ]
+
+    if typed:
+        # Na 1ª linha: o server não procura funcionários ("ID - NOME") nela
+        rows[0] += ['', 'Emissão:', datetime.datetime(2025, 11, 5, 14, 30), datetime.date(2025, 11, 5), datetime.time(14, 30)]
+
+    half = events_per_employee // 2
+
+    for emp in range(1, employees + 1):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        rows.append([f'{emp} - {name}'])
+
+        codes = sorted(rng.sample(range(1, len(EVENT_NAMES) + 1), events_per_employee))
+        for position, code in enumerate(codes):
+            for reference in references:
+                # Alguns eventos não aparecem em todas as competências
+                if rng.random() < 0.1:
+                    continue
+
+                row = [''] * ROW_WIDTH
+                row[0] = code if typed else str(code)
+                row[4] = EVENT_NAMES[code - 1]
+                row[17] = reference
+                value = round(rng.uniform(10, 9000), 2)
+                row[20] = value if typed else format_brl(value)
+                if code == 1:
+                    row[23] = datetime.timedelta(hours=220) if typed else '220:00'
+                else:
+                    quantity = round(rng.uniform(0, 100), 2)
+                    row[23] = quantity if typed else format_brl(quantity)
+                row[24] = 'P' if position < half else 'D'
+                rows.append(row)
+
+    # Exportações reais são retangulares (mesmo número de colunas em todas as linhas)
+    return [row + [''] * (ROW_WIDTH - len(row)) for row in rows]
+
+
+def write_payroll(rows: List[List[Any]], path: str):
+    """
+    Grava a folha como .xlsx ou .csv (separador ';')
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in ('.csv', '.txt'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f, delimiter=';').writerows(rows)
+    else:
+        # openpyxl direto: o pandas grava time como texto e timedelta como número
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Movimentos')
+        for row in rows:
+            ws.append([None if cell == '' else cell for cell in row])
+        wb.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera folhas de pagamento sintéticas')
+    parser.add_argument('--employees', type=int, default=100)
+    parser.add_argument('--events', type=int, default=14, help='Eventos por funcionário')
+    parser.add_argument('--references', default=','.join(DEFAULT_REFERENCES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--typed', action='store_true', help='Números e datas como células nativas (.xlsx)')
+    parser.add_argument('--output', default='folha_sintetica.xlsx')
+    args = parser.parse_args()
+
+    rows = generate_payroll_rows(args.employees, args.events, args.references.split(','), args.seed, args.typed)
+    write_payroll(rows, args.output)
+    print(f'✅ {args.output}: {args.employees} funcionários, {len(rows)} linhas')
+
+
+if __name__ == '__main__':
+    main()
@@ -15,18 +15,45 @@ VERSÃO: 3.0 - Payroll Processing Engine
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, abort
 from flask_cors import CORS
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 import pandas as pd
 import numpy as np
 import re
 import os
+import sys
 import tempfile
 import traceback
-from typing import Dict, List, Any, Optional
+import cProfile
+import pstats
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import gzip
+import mimetypes
+import math
+import abc
+import datetime
+import importlib.util
+from collections import Counter, OrderedDict, deque
+from typing import Dict, List, Any, Optional, Iterator, Sequence
 from decimal import Decimal, InvalidOperation
 
+try:
+    import resource  # Indisponível no Windows
+except ImportError:
+    resource = None
+
+try:
+    import brotli  # Opcional: habilita Content-Encoding: br
+except ImportError:
+    brotli = None
+
 APP_VERSION = os.getenv('APP_VERSION', '3.0.1-functional')
 app = Flask(__name__)
 CORS(app)
@@ -35,13 +62,63 @@ CORS(app)
 # CONFIGURAÇÕES
 # ═══════════════════════════════════════════════════════════════════════════
 
-MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_FILE_SIZE = int(os.getenv('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))  # 50MB
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE  # Uploads maiores → 413 antes de ler o corpo
+
+# Controle de admissão do /parse-excel
+PARSE_MAX_CONCURRENCY = int(os.getenv('PARSE_MAX_CONCURRENCY', '4'))
+PARSE_MEMORY_BUDGET = int(os.getenv('PARSE_MEMORY_BUDGET_MB', '1024')) * 1024 * 1024
+PARSE_QUEUE_SIZE = int(os.getenv('PARSE_QUEUE_SIZE', '16'))  # requisições aguardando vaga
+PARSE_QUEUE_TIMEOUT = float(os.getenv('PARSE_QUEUE_TIMEOUT', '30'))  # segundos
+
+# Estimativa de memória de um parse: base + tamanho do arquivo × fator do formato
+# (grade de strings + estrutura + JSON). Fatores = aumento do pico de RSS por byte
+# do arquivo, medido com payroll_generator.py (200 a 2000 funcionários) no engine
+# padrão (calamine):
+# - XLSX: 21x a 57x conforme a compactação (células vazias gravadas ou não); vale o pior
+# - XLS: ~26x com calamine (~17x com xlrd, o fallback)
+# - CSV: ~24x
+# Formatos não medidos (.xlsb, .ods) usam o fator do XLSX
+PARSE_BASE_MEMORY = 16 * 1024 * 1024
+PARSE_MEMORY_FACTORS = {
+    '.xlsx': 57,
+    '.xlsm': 57,
+    '.xls': 26,
+    '.csv': 24,
+    '.txt': 24
+}
+PARSE_DEFAULT_MEMORY_FACTOR = 57
 
 # Padrões de reconhecimento
 EMPLOYEE_PATTERN = re.compile(r'^(\d+)\s*-\s*(.+)$')
 REFERENCE_PATTERN = re.compile(r'(\d{1,2}/\d{4})')
 TOTAL_PATTERN = re.compile(r'total', re.IGNORECASE)
 
+# Profiling sob demanda (desligado por padrão)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'folha_profiles'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # 0.0 a 1.0
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000.0
+PROFILE_MAX_KEEP = int(os.getenv('PROFILE_MAX_KEEP', '50'))
+PROFILE_ID_PATTERN = re.compile(r'^\d+_[0-9a-f]{16}$')
+PROFILE_FILES = {
+    'pstats': '.prof',
+    'collapsed': '.collapsed.txt',
+    'meta': '.json'
+}
+
+# Compressão e cache HTTP
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))  # bytes
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))  # gzip das respostas dinâmicas
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '3600'))  # segundos
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '0'))  # resultados em memória (0 = desligado)
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '300'))  # segundos até o resultado ser descartado
+STATIC_ASSETS = {
+    'index_v2.html': 'no-cache',  # sempre revalida (304 se não mudou)
+    'app_v2.js': f'public, max-age={STATIC_MAX_AGE}',
+    'ajuda.html': f'public, max-age={STATIC_MAX_AGE}'
+}
+
 # ═══════════════════════════════════════════════════════════════════════════
 # FUNÇÕES DE CONVERSÃO DE VALORES (ESPECIALISTA)
 # ═══════════════════════════════════════════════════════════════════════════
@@ -158,10 +235,327 @@ def detect_value_type(value: Any) -> str:
         return 'integer'
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# LEITURA DE PLANILHAS (ENGINES)
+# ═══════════════════════════════════════════════════════════════════════════
+
+class EmptyWorkbookError(Exception):
+    """Planilha sem nenhuma aba"""
+
+
+class ReaderEngine(abc.ABC):
+    """
+    Backend de leitura: iter_rows(path) produz as linhas da aba de movimentos
+    como sequências de valores crus (str, int, float, datetime, None...).
+    A conversão para texto fica em read_spreadsheet, igual para todos.
+    """
+    
+    name = ''
+    extensions = ()
+    module = None  # Pacote opcional exigido pelo engine
+    
+    def available(self) -> bool:
+        return self.module is None or importlib.util.find_spec(self.module) is not None
+    
+    @abc.abstractmethod
+    def iter_rows(self, path: str) -> Iterator[Sequence[Any]]:
+        """Linhas da aba escolhida, a partir de A1"""
+
+
+def pick_sheet(sheet_names: List[str]) -> str:
+    """Aba "Movimentos" se existir, senão a primeira"""
+    if not sheet_names:
+        raise EmptyWorkbookError('Arquivo sem planilhas')
+    return 'Movimentos' if 'Movimentos' in sheet_names else sheet_names[0]
+
+
+class OpenpyxlEngine(ReaderEngine):
+    """XLSX via openpyxl em modo streaming (read_only)"""
+    
+    name = 'openpyxl'
+    extensions = ('.xlsx', '.xlsm')
+    module = 'openpyxl'
+    
+    def iter_rows(self, path):
+        from openpyxl import load_workbook
+        
+        wb = load_workbook(filename=path, read_only=True, data_only=True)
+        try:
+            print(f'  📑 Workbook carregado: {wb.sheetnames}')
+            sheet_name = pick_sheet(wb.sheetnames)
+            print(f'  📄 Lendo sheet: {sheet_name}')
+            yield from wb[sheet_name].iter_rows(values_only=True)
+        finally:
+            wb.close()
+
+
+class CalamineEngine(ReaderEngine):
+    """XLSX/XLS/XLSB/ODS via calamine (Rust, o mesmo do engine 'calamine' do pandas)"""
+    
+    name = 'calamine'
+    extensions = ('.xlsx', '.xlsm', '.xlsb', '.xls', '.ods')
+    module = 'python_calamine'
+    
+    def iter_rows(self, path):
+        from python_calamine import CalamineWorkbook
+        
+        wb = CalamineWorkbook.from_path(path)
+        try:
+            print(f'  📑 Workbook carregado: {wb.sheet_names}')
+            sheet_name = pick_sheet(wb.sheet_names)
+            print(f'  📄 Lendo sheet: {sheet_name}')
+            # skip_empty_area=False mantém as posições a partir de A1
+            yield from wb.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False)
+        finally:
+            wb.close()
+
+
+class XlrdEngine(ReaderEngine):
+    """XLS legado (BIFF) via xlrd"""
+    
+    name = 'xlrd'
+    extensions = ('.xls',)
+    module = 'xlrd'
+    
+    def iter_rows(self, path):
+        import xlrd
+        
+        # formatting_info: precisa do formato para distinguir duração ([h]:mm) de data
+        book = xlrd.open_workbook(path, on_demand=True, formatting_info=True)
+        try:
+            print(f'  📑 Workbook carregado: {book.sheet_names()}')
+            sheet_name = pick_sheet(book.sheet_names())
+            print(f'  📄 Lendo sheet: {sheet_name}')
+            sheet = book.sheet_by_name(sheet_name)
+            
+            for row_idx in range(sheet.nrows):
+                row = []
+                for cell in sheet.row(row_idx):
+                    if cell.ctype == xlrd.XL_CELL_DATE:
+                        row.append(self.convert_date(book, cell))
+                    elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                        row.append(bool(cell.value))
+                    elif cell.ctype in (xlrd.XL_CELL_ERROR, xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                        row.append(None)
+                    else:
+                        row.append(cell.value)
+                yield row
+        finally:
+            book.release_resources()
+    
+    @staticmethod
+    def convert_date(book, cell) -> Any:
+        """
+        Serial de data do Excel → datetime, time (só hora) ou timedelta
+        (formato de duração), como calamine e openpyxl devolvem
+        """
+        import xlrd
+        
+        number_format = book.format_map[book.xf_list[cell.xf_index].format_key].format_str
+        if '[h' in number_format.lower() or '[m' in number_format.lower() or '[s' in number_format.lower():
+            return datetime.timedelta(days=cell.value)
+        
+        value = xlrd.xldate.xldate_as_datetime(cell.value, book.datemode)
+        return value.time() if cell.value < 1 else value
+
+
+class CsvEngine(ReaderEngine):
+    """CSV/TXT via pandas, testando encodings comuns e detectando o separador"""
+    
+    name = 'csv'
+    extensions = ('.csv', '.txt')
+    module = 'pandas'
+    
+    def iter_rows(self, path):
+        encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
+        for enc in encodings:
+            try:
+                df = pd.read_csv(path, encoding=enc, header=None, sep=None, engine='python')
+                print(f'✅ CSV lido com encoding: {enc}')
+                break
+            except Exception:
+                continue
+        else:
+            raise ValueError('CSV ilegível em todos os encodings testados')
+        
+        yield from df.itertuples(index=False, name=None)
+
+
+READER_ENGINES = {}  # {nome: ReaderEngine}
+
+
+def register_reader_engine(engine: ReaderEngine) -> ReaderEngine:
+    READER_ENGINES[engine.name] = engine
+    return engine
+
+
+for _engine in (CalamineEngine(), OpenpyxlEngine(), XlrdEngine(), CsvEngine()):
+    register_reader_engine(_engine)
+
+# Ordem de preferência por extensão (o primeiro disponível é o padrão;
+# os demais são tentados se a leitura falhar)
+ENGINE_PREFERENCE = {
+    '.xlsx': ['calamine', 'openpyxl'],
+    '.xlsm': ['calamine', 'openpyxl'],
+    '.xlsb': ['calamine'],
+    '.ods': ['calamine'],
+    '.xls': ['calamine', 'xlrd'],
+    '.csv': ['csv'],
+    '.txt': ['csv']
+}
+
+
+# Assinaturas (magic bytes) dos formatos binários: exportações de sistemas
+# de folha costumam mandar XLSX com extensão .xls (e vice-versa)
+ZIP_SIGNATURE = b'PK\x03\x04'  # XLSX/XLSM/XLSB/ODS
+OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # XLS (BIFF)
+ZIP_EXTENSIONS = ('.xlsx', '.xlsm', '.xlsb', '.ods')
+
+
+def detect_spreadsheet_format(head: bytes, extension: str) -> str:
+    """
+    Extensão que corresponde ao conteúdo real do arquivo, pelos primeiros
+    bytes. Sem assinatura conhecida (CSV/TXT), vale a extensão do nome.
+    """
+    
+    if head.startswith(ZIP_SIGNATURE):
+        return extension if extension in ZIP_EXTENSIONS else '.xlsx'
+    if head.startswith(OLE2_SIGNATURE):
+        return '.xls'
+    return extension
+
+
+def select_reader_engines(extension: str, requested: Optional[str] = None) -> List[ReaderEngine]:
+    """
+    Engines a tentar, em ordem. Com `requested`, apenas ele (se disponível e
+    compatível com a extensão); senão, os disponíveis por preferência.
+    """
+    
+    if requested:
+        engine = READER_ENGINES.get(requested)
+        if engine is None or extension not in engine.extensions or not engine.available():
+            return []
+        return [engine]
+    
+    return [READER_ENGINES[name] for name in ENGINE_PREFERENCE.get(extension, []) if READER_ENGINES[name].available()]
+
+
+def round_to_second(value: datetime.datetime) -> datetime.datetime:
+    """Serial do Excel é float: 12:29:59.999999 vira 12:30:00"""
+    return (value + datetime.timedelta(microseconds=500000)).replace(microsecond=0)
+
+
+def cell_to_str(value: Any) -> str:
+    """
+    Converte a célula para texto de forma igual em todos os engines:
+    vazio/NaN → '', float inteiro → '1' (e não '1.0'),
+    data/data e hora → '2025-10-01 00:00:00', hora → '08:30:00',
+    duração → '220:00:00' (horas totais, como o formato [h]:mm:ss)
+    """
+    
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ''
+        if value.is_integer():
+            return str(int(value))
+    # datetime antes de date (datetime é subclasse de date)
+    if isinstance(value, datetime.datetime):
+        return round_to_second(value).strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, datetime.date):
+        return value.strftime('%Y-%m-%d 00:00:00')
+    if isinstance(value, datetime.time):
+        return round_to_second(datetime.datetime.combine(datetime.date.min, value)).strftime('%H:%M:%S')
+    if isinstance(value, datetime.timedelta):
+        seconds = round(value.total_seconds())
+        sign = '-' if seconds < 0 else ''
+        hours, rest = divmod(abs(seconds), 3600)
+        return f'{sign}{hours}:{rest // 60:02d}:{rest % 60:02d}'
+    return str(value)
+
+
+def read_spreadsheet(engine: ReaderEngine, path: str) -> List[List[str]]:
+    """
+    Lê todas as linhas com o engine e devolve uma grade retangular de strings
+    (linhas vazias finais removidas, como no pandas.read_excel)
+    """
+    
+    rows = []
+    width = 0
+    last_non_empty = -1
+    
+    for raw_row in engine.iter_rows(path):
+        row = [cell_to_str(cell) for cell in raw_row]
+        while row and row[-1] == '':
+            row.pop()
+        if row:
+            width = max(width, len(row))
+            last_non_empty = len(rows)
+        rows.append(row)
+    
+    del rows[last_non_empty + 1:]
+    for row in rows:
+        row.extend([''] * (width - len(row)))
+    
+    return rows
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # ESTRUTURAÇÃO INTELIGENTE DE DADOS
 # ═══════════════════════════════════════════════════════════════════════════
 
+# Ordem de exibição por tipo: P (proventos), D (descontos), demais
+TIPO_ORDER = {'P': 0, 'D': 1}
+
+
+class PayrollEvent:
+    """
+    Evento de um funcionário (código + descrição + tipo) durante a estruturação.
+    
+    Compacto (__slots__) e esparso: guarda apenas as referências em que o evento
+    aparece, como tuplas (calculado, informado, diferença). A chave de ordenação
+    P/D/código é calculada uma única vez na criação. Os objetos ficam no
+    resultado até a serialização (PayrollJSONProvider), sem cópia em dicts.
+    """
+    
+    __slots__ = ('code', 'description', 'tipo', 'sort_key', 'values')
+    
+    def __init__(self, code: str, description: str, tipo: str):
+        self.code = code
+        self.description = description
+        self.tipo = tipo
+        self.sort_key = (TIPO_ORDER.get(tipo.upper(), 2), int(code) if code.isdigit() else 9999)
+        self.values = {}  # {referência: (calculado, informado, diferença)}
+    
+    def to_dict(self) -> Dict:
+        return {
+            'code': self.code,
+            'description': self.description,
+            'tipo': self.tipo,
+            'values': {
+                ref: {'calculated': calculated, 'informed': informed, 'difference': difference}
+                for ref, (calculated, informed, difference) in self.values.items()
+            }
+        }
+
+
+class PayrollJSONProvider(DefaultJSONProvider):
+    """
+    Serializa PayrollEvent direto no JSON: o dict de cada evento só existe
+    enquanto é codificado
+    """
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, PayrollEvent):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
+app.json = PayrollJSONProvider(app)
+
+
 def structure_payroll_data(raw_data: List[List[str]]) -> Dict[str, Any]:
     """
     ESTRUTURAÇÃO INTELIGENTE DE DADOS DE FOLHA DE PAGAMENTO
@@ -287,6 +681,10 @@ def structure_payroll_data(raw_data: List[List[str]]) -> Dict[str, Any]:
         for col_idx, cell in enumerate(row):
             cell_str = str(cell).strip()
             
+            # Pré-filtro barato: o padrão exige dígito inicial e um hífen
+            if not cell_str[:1].isdigit() or '-' not in cell_str:
+                continue
+            
             # Regex: ^(\d+)\s*-\s*(.+)$
             match = EMPLOYEE_PATTERN.match(cell_str)
             
@@ -326,7 +724,7 @@ def structure_payroll_data(raw_data: List[List[str]]) -> Dict[str, Any]:
                     current_employee = {
                         'id': emp_id,
                         'name': emp_name,
-                        'events_map': {},  # {event_key: {ref: {calc, info}}}
+                        'events_map': {},  # {(código, descrição, tipo): PayrollEvent}
                         'references': set()
                     }
                     
@@ -390,23 +788,23 @@ def structure_payroll_data(raw_data: List[List[str]]) -> Dict[str, Any]:
             informed = round(informed, 2)
             
             # Adicionar referência aos sets
+            reference = sys.intern(reference)
             all_references.add(reference)
             current_employee['references'].add(reference)
             
-            # Chave única do evento (código + descrição + tipo)
+            # Chave única do evento (código + descrição + tipo); strings internadas
+            # porque se repetem em todos os funcionários
             tipo_flag = str(tipo_raw).strip().upper()[:1] if tipo_raw is not None else ''
-            event_key = f"{code}|||{description}|||{tipo_flag}"
+            event_key = (sys.intern(code), sys.intern(description), tipo_flag)
             
-            # Criar estrutura se não existe
-            if event_key not in current_employee['events_map']:
-                current_employee['events_map'][event_key] = {'tipo': tipo_flag}
+            # Criar registro se não existe
+            event = current_employee['events_map'].get(event_key)
+            if event is None:
+                event = PayrollEvent(*event_key)
+                current_employee['events_map'][event_key] = event
             
             # Armazenar valores por referência
-            current_employee['events_map'][event_key][reference] = {
-                'calculated': calculated,
-                'informed': informed,
-                'difference': round(calculated - informed, 2)
-            }
+            event.values[reference] = (calculated, informed, round(calculated - informed, 2))
             
             event_count += 1
             
@@ -484,57 +882,20 @@ def detect_column_indices(headers: List[str]) -> Dict[str, int]:
     return col_map
 
 
-def convert_to_transposed_structure(events_map: Dict, references: List[str]) -> List[Dict]:
-    """
-    Converte Map de eventos para estrutura transposta
+def convert_to_transposed_structure(events_map: Dict, references: List[str]) -> List[PayrollEvent]:
     """
+    Converte Map de eventos (PayrollEvent) para estrutura transposta: lista
+    ordenada de eventos, serializada como {code, description, tipo, values}.
     
-    events = []
-    
-    for event_key, ref_values in events_map.items():
-        parts = event_key.split('|||')
-        code = parts[0]
-        description = parts[1]
-        tipo = parts[2] if len(parts) > 2 else ''
-        
-        event = {
-            'code': code,
-            'description': description,
-            'tipo': tipo,
-            'values': {}
-        }
-        
-        # Para cada referência, adicionar valores (filtra 'tipo' se presente)
-        for ref in references:
-            if ref in ref_values:
-                event['values'][ref] = ref_values[ref]
-            elif ref != 'tipo':
-                event['values'][ref] = {
-                    'calculated': 0.0,
-                    'informed': 0.0,
-                    'difference': 0.0
-                }
-        
-        events.append(event)
+    Valores são esparsos: referências em que o evento não aparece são omitidas
+    (o frontend exibe zero).
+    """
     
     # Ordenar: P primeiro, D segundo, demais depois; dentro de cada grupo, por código
-    def sort_key(e):
-        tipo = e.get('tipo', '').upper()
-        if tipo == 'P':
-            order = 0
-        elif tipo == 'D':
-            order = 1
-        else:
-            order = 2
-        code_num = int(e['code']) if e['code'].isdigit() else 9999
-        return (order, code_num)
-    
-    events.sort(key=sort_key)
-    
-    return events
+    return sorted(events_map.values(), key=lambda e: e.sort_key)
 
 
-def calculate_employee_totals(events: List[Dict], references: List[str]) -> Dict:
+def calculate_employee_totals(events: List[PayrollEvent], references: List[str]) -> Dict:
     """
     Calcula totais por referência para um funcionário
     """
@@ -542,8 +903,8 @@ def calculate_employee_totals(events: List[Dict], references: List[str]) -> Dict
     totals = {}
     
     for ref in references:
-        calc_sum = sum(e['values'][ref]['calculated'] for e in events)
-        info_sum = sum(e['values'][ref]['informed'] for e in events)
+        calc_sum = sum(e.values[ref][0] for e in events if ref in e.values)
+        info_sum = sum(e.values[ref][1] for e in events if ref in e.values)
         calc_sum = round(calc_sum, 2)
         info_sum = round(info_sum, 2)
         diff_sum = round(calc_sum - info_sum, 2)
@@ -584,32 +945,539 @@ def calculate_global_summary(employees: List[Dict], references: List[str]) -> Di
     return summary
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# PROFILING SOB DEMANDA
+# ═══════════════════════════════════════════════════════════════════════════
+
+def is_admin_request() -> bool:
+    """
+    Verifica o header X-Admin-Token contra ADMIN_TOKEN
+    (sem token configurado, nenhuma requisição é admin)
+    """
+    
+    if not ADMIN_TOKEN:
+        return False
+    
+    token = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def profile_trigger() -> Optional[str]:
+    """
+    Decide se a requisição atual roda sob o profiler:
+    - 'admin': admin pediu explicitamente (header X-Profile: 1 ou ?profile=1)
+    - 'sampled': sorteada pela taxa de amostragem PROFILE_SAMPLE_RATE
+    - None: sem profiling
+    """
+    
+    flag = request.headers.get('X-Profile') or request.args.get('profile', '')
+    if flag.strip().lower() in ('1', 'true', 'yes') and is_admin_request():
+        return 'admin'
+    
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    
+    return None
+
+
+def hash_uploaded_file(file) -> str:
+    """
+    SHA-256 do arquivo enviado, lido em blocos (o stream volta ao início)
+    """
+    
+    digest = hashlib.sha256()
+    stream = file.stream
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class StackSampler:
+    """
+    Amostrador de pilhas em thread paralela.
+    
+    Complementa o cProfile (que só registra pares chamador/chamado) com pilhas
+    completas no formato "collapsed" (frame1;frame2;frame3 N), aceito por
+    flamegraph.pl, speedscope e similares.
+    """
+    
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            
+            self.counts[';'.join(reversed(stack))] += 1
+    
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+def summarize_profile(stats: pstats.Stats, sort_field: str, limit: int = 20) -> List[Dict]:
+    """
+    Top N funções do cProfile (por 'tottime' ou 'cumtime')
+    """
+    
+    rows = []
+    for (filename, line, name), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append({
+            'function': f'{name} ({os.path.basename(filename)}:{line})',
+            'calls': nc,
+            'tottime': round(tt, 6),
+            'cumtime': round(ct, 6)
+        })
+    
+    rows.sort(key=lambda r: r[sort_field], reverse=True)
+    return rows[:limit]
+
+
+def stored_profile_ids() -> List[str]:
+    """
+    IDs dos profiles em PROFILE_DIR, do mais antigo ao mais recente
+    (outros arquivos no diretório são ignorados)
+    """
+    
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    
+    profile_ids = (name[:-len('.json')] for name in os.listdir(PROFILE_DIR) if name.endswith('.json'))
+    return sorted(
+        (pid for pid in profile_ids if PROFILE_ID_PATTERN.match(pid)),
+        key=lambda pid: int(pid.split('_')[0])
+    )
+
+
+def prune_profiles():
+    """
+    Mantém apenas os PROFILE_MAX_KEEP profiles mais recentes em disco
+    """
+    
+    profile_ids = stored_profile_ids()
+    
+    for profile_id in profile_ids[:-PROFILE_MAX_KEEP] if PROFILE_MAX_KEEP > 0 else profile_ids:
+        for suffix in PROFILE_FILES.values():
+            try:
+                os.unlink(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except OSError:
+                pass
+
+
+def run_profiled(handler, file_sha256: str, extension: str, trigger: str):
+    """
+    Executa o handler sob cProfile + amostrador de pilhas e grava em PROFILE_DIR:
+    - <id>.prof          → estatísticas cProfile (pstats / snakeviz)
+    - <id>.collapsed.txt → pilhas colapsadas (flamegraph)
+    - <id>.json          → metadados e funções mais custosas
+    
+    Nenhum conteúdo do arquivo (nem o nome original) é guardado: apenas o hash.
+    """
+    
+    profile_id = f'{int(time.time() * 1000)}_{file_sha256[:16]}'
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+    status = None
+    
+    started = time.perf_counter()
+    try:
+        sampler.start()
+        profiler.enable()
+    except Exception as e:
+        # Ex.: Python 3.12+ recusa um segundo profiler ativo (requisições concorrentes)
+        sampler.stop()
+        print(f'⚠️  Profiling indisponível ({e}); processando sem profiler')
+        return handler()
+    
+    try:
+        response = handler()
+        status = response[1] if isinstance(response, tuple) else 200
+        return response
+    finally:
+        profiler.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+        
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base_path = os.path.join(PROFILE_DIR, profile_id)
+            
+            profiler.dump_stats(base_path + PROFILE_FILES['pstats'])
+            with open(base_path + PROFILE_FILES['collapsed'], 'w', encoding='utf-8') as f:
+                f.write(sampler.collapsed())
+            
+            stats = pstats.Stats(profiler)
+            meta = {
+                'id': profile_id,
+                'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'sha256': file_sha256,
+                'extension': extension,
+                'trigger': trigger,
+                'status': status,
+                'durationSeconds': round(elapsed, 4),
+                'samples': sum(sampler.counts.values()),
+                'topByTottime': summarize_profile(stats, 'tottime'),
+                'topByCumtime': summarize_profile(stats, 'cumtime')
+            }
+            with open(base_path + PROFILE_FILES['meta'], 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            
+            prune_profiles()
+            print(f'🔬 Profile salvo: {profile_id} ({elapsed:.2f}s, {trigger})')
+        except Exception as e:
+            print(f'⚠️  Falha ao salvar profile {profile_id}: {e}')
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# COMPRESSÃO E CACHE HTTP
+# ═══════════════════════════════════════════════════════════════════════════
+
+def compress_bytes(data: bytes, encoding: str, static: bool = False) -> bytes:
+    """
+    Comprime com gzip ou brotli (nível máximo para estáticos, moderado para respostas)
+    """
+    
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if static else 5)
+    
+    # mtime=0: mesma entrada gera os mesmos bytes (ETag estável)
+    return gzip.compress(data, compresslevel=9 if static else COMPRESS_LEVEL, mtime=0)
+
+
+def negotiate_encoding(available) -> str:
+    """
+    Escolhe a melhor codificação aceita pelo cliente (Accept-Encoding)
+    """
+    
+    best, best_quality = 'identity', 0
+    for encoding in ('br', 'gzip'):
+        if encoding in available:
+            quality = request.accept_encodings.quality(encoding)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+    return best
+
+
+class EncodedBody:
+    """
+    Corpo de resposta com variantes comprimidas pré-calculadas e ETag forte.
+    
+    Com keep_identity=False só as variantes comprimidas ficam em memória; clientes
+    sem gzip recebem a descompressão sob demanda.
+    """
+    
+    __slots__ = ('mimetype', 'etag', 'variants')
+    
+    def __init__(self, data: bytes, mimetype: str, static: bool = False, keep_identity: bool = True):
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(data).hexdigest()[:32]
+        self.variants = {'gzip': compress_bytes(data, 'gzip', static)}
+        if brotli is not None:
+            self.variants['br'] = compress_bytes(data, 'br', static)
+        if keep_identity:
+            self.variants['identity'] = data
+    
+    def get(self, encoding: str) -> bytes:
+        if encoding in self.variants:
+            return self.variants[encoding]
+        return gzip.decompress(self.variants['gzip'])
+
+
+def send_encoded(body: EncodedBody, cache_control: str):
+    """
+    Resposta negociada (br/gzip/identity) com ETag por variante;
+    GET/HEAD com If-None-Match correspondente recebem 304
+    """
+    
+    encoding = negotiate_encoding(body.variants)
+    etag = body.etag if encoding == 'identity' else f'{body.etag}-{encoding}'
+    
+    if request.method in ('GET', 'HEAD') and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body.get(encoding), mimetype=body.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+_static_assets = {}  # {nome: (mtime_ns, EncodedBody)}
+
+
+def load_static_asset(name: str) -> Optional[EncodedBody]:
+    """
+    Lê e pré-comprime um arquivo estático; recarrega se o arquivo mudou em disco
+    """
+    
+    path = os.path.join(app.root_path, name)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    
+    cached = _static_assets.get(name)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    body = EncodedBody(data, mimetypes.guess_type(name)[0] or 'application/octet-stream', static=True)
+    _static_assets[name] = (mtime, body)
+    return body
+
+
+def serve_static_asset(name: str):
+    body = load_static_asset(name)
+    if body is None:
+        abort(404)
+    return send_encoded(body, STATIC_ASSETS[name])
+
+
+_result_cache = OrderedDict()  # {resultId: (expira_em, EncodedBody)}, LRU
+_result_cache_lock = threading.Lock()
+
+
+def purge_expired_results(now: float):
+    """Remove do cache os resultados com TTL vencido (chamar com o lock)"""
+    
+    for result_id in [rid for rid, (expires_at, _) in _result_cache.items() if expires_at <= now]:
+        del _result_cache[result_id]
+
+
+def result_response(result_id: Optional[str], payload: Dict):
+    """
+    Serializa o resultado de /parse-excel, guarda a versão comprimida no cache
+    (GET /results/<resultId>, só se RESULT_CACHE_SIZE > 0) e devolve a
+    resposta negociada
+    """
+    
+    body = EncodedBody(app.json.dumps(payload).encode('utf-8'), 'application/json', keep_identity=False)
+    response = send_encoded(body, 'private, no-cache')
+    
+    if result_id is not None:
+        now = time.monotonic()
+        with _result_cache_lock:
+            purge_expired_results(now)
+            _result_cache[result_id] = (now + RESULT_CACHE_TTL, body)
+            _result_cache.move_to_end(result_id)
+            while len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+        response.headers['Content-Location'] = f'/results/{result_id}'
+    
+    return response, 200
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Comprime respostas JSON que ainda não foram codificadas
+    """
+    
+    if (response.direct_passthrough
+            or response.status_code in (204, 304)
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    
+    encoding = negotiate_encoding(('br', 'gzip') if brotli is not None else ('gzip',))
+    if encoding == 'identity':
+        return response
+    
+    response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONTROLE DE ADMISSÃO (MEMÓRIA / CONCORRÊNCIA)
+# ═══════════════════════════════════════════════════════════════════════════
+
+def estimate_parse_memory(file_size: int, extension: str) -> int:
+    """
+    Estimativa de pico de memória (bytes) para processar um arquivo
+    """
+    
+    factor = PARSE_MEMORY_FACTORS.get(extension, PARSE_DEFAULT_MEMORY_FACTOR)
+    return PARSE_BASE_MEMORY + file_size * factor
+
+
+class AdmissionController:
+    """
+    Limita parses simultâneos por número e por memória estimada.
+    
+    Requisições que não cabem esperam numa fila FIFO limitada (o primeiro da fila
+    tem prioridade, para arquivos grandes não ficarem para trás indefinidamente).
+    Um job maior que o orçamento inteiro só roda sozinho.
+    """
+    
+    def __init__(self, memory_budget: int, max_concurrency: int, max_queue: int):
+        self.memory_budget = memory_budget
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.reserved = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.timed_out_total = 0
+        self.avg_parse_seconds = 1.0  # média móvel exponencial
+        self._queue = deque()
+        self._cond = threading.Condition()
+    
+    def _fits(self, cost: int) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        return self.active == 0 or self.reserved + cost <= self.memory_budget
+    
+    def _admit(self, cost: int):
+        self.active += 1
+        self.reserved += cost
+        self.admitted_total += 1
+    
+    def acquire(self, cost: int, timeout: float) -> Optional[str]:
+        """
+        Reserva uma vaga. Retorna None se admitido, ou o motivo da recusa
+        ('QUEUE_FULL' / 'QUEUE_TIMEOUT')
+        """
+        
+        cost = min(cost, self.memory_budget)
+        
+        with self._cond:
+            if not self._queue and self._fits(cost):
+                self._admit(cost)
+                return None
+            
+            if len(self._queue) >= self.max_queue:
+                self.rejected_total += 1
+                return 'QUEUE_FULL'
+            
+            ticket = object()
+            self._queue.append(ticket)
+            deadline = time.monotonic() + timeout
+            try:
+                while not (self._queue[0] is ticket and self._fits(cost)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out_total += 1
+                        return 'QUEUE_TIMEOUT'
+                    self._cond.wait(remaining)
+                
+                self._admit(cost)
+                return None
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+    
+    def release(self, cost: int, elapsed: float):
+        cost = min(cost, self.memory_budget)
+        with self._cond:
+            self.active -= 1
+            self.reserved -= cost
+            self.avg_parse_seconds = 0.8 * self.avg_parse_seconds + 0.2 * elapsed
+            self._cond.notify_all()
+    
+    def retry_after(self) -> int:
+        """Segundos sugeridos no header Retry-After"""
+        with self._cond:
+            waiting = len(self._queue) + self.active + 1
+            return max(1, math.ceil(self.avg_parse_seconds * waiting / self.max_concurrency))
+    
+    def gauges(self) -> Dict:
+        with self._cond:
+            return {
+                'active': self.active,
+                'queued': len(self._queue),
+                'reservedBytes': self.reserved,
+                'memoryBudgetBytes': self.memory_budget,
+                'maxConcurrency': self.max_concurrency,
+                'maxQueue': self.max_queue,
+                'admittedTotal': self.admitted_total,
+                'rejectedTotal': self.rejected_total,
+                'timedOutTotal': self.timed_out_total,
+                'avgParseSeconds': round(self.avg_parse_seconds, 3)
+            }
+
+
+admission = AdmissionController(PARSE_MEMORY_BUDGET, PARSE_MAX_CONCURRENCY, PARSE_QUEUE_SIZE)
+
+
+def uploaded_file_size(file) -> int:
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def uploaded_file_format(file) -> str:
+    """Extensão que corresponde ao conteúdo do upload (ver detect_spreadsheet_format)"""
+    extension = os.path.splitext(secure_filename(file.filename))[1].lower()
+    head = file.stream.read(len(OLE2_SIGNATURE))
+    file.stream.seek(0)
+    return detect_spreadsheet_format(head, extension)
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # ENDPOINTS
 # ═══════════════════════════════════════════════════════════════════════════
 
+# Pré-compressão dos estáticos na inicialização
+for _asset_name in STATIC_ASSETS:
+    load_static_asset(_asset_name)
+
+
 @app.route('/')
 def index():
     """Serve a página principal"""
-    return send_from_directory('.', 'index_v2.html')
+    return serve_static_asset('index_v2.html')
 
 
 @app.route('/index_v2.html')
 def index_v2():
     """Serve a página principal"""
-    return send_from_directory('.', 'index_v2.html')
+    return serve_static_asset('index_v2.html')
 
 
 @app.route('/app_v2.js')
 def app_js():
     """Serve o JavaScript"""
-    return send_from_directory('.', 'app_v2.js')
+    return serve_static_asset('app_v2.js')
 
 
 @app.route('/ajuda.html')
 def ajuda():
     """Serve a página de ajuda"""
-    return send_from_directory('.', 'ajuda.html')
+    return serve_static_asset('ajuda.html')
 
 
 @app.route('/health', methods=['GET'])
@@ -617,10 +1485,146 @@ def health_check():
     return jsonify({'status': 'healthy', 'version': APP_VERSION}), 200
 
 
+def current_rss_bytes() -> Optional[int]:
+    """RSS atual do processo (Linux, via /proc)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de RSS desde o início do processo"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas do processo (usadas pelo loadtest.py)"""
+    return jsonify({
+        'version': APP_VERSION,
+        'rssBytes': current_rss_bytes(),
+        'peakRssBytes': peak_rss_bytes(),
+        'admission': admission.gauges()
+    }), 200
+
+
+@app.errorhandler(413)
+def file_too_large(e):
+    return jsonify({
+        'success': False,
+        'errorCode': 'FILE_TOO_LARGE',
+        'message': f'Arquivo maior que o limite de {MAX_FILE_SIZE // (1024 * 1024)}MB',
+        'suggestion': '💡 Divida o arquivo por período ou salve como CSV UTF-8'
+    }), 413
+
+
+@app.route('/profiles', methods=['GET'])
+def list_profiles():
+    """Lista os profiles mais recentes (admin)"""
+    
+    if not is_admin_request():
+        return jsonify({'success': False, 'errorCode': 'FORBIDDEN', 'message': 'Acesso restrito'}), 403
+    
+    limit = request.args.get('limit', 20, type=int)
+    profiles = []
+    
+    for profile_id in reversed(stored_profile_ids()[-limit:] if limit > 0 else []):
+        try:
+            with open(os.path.join(PROFILE_DIR, profile_id + PROFILE_FILES['meta']), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({k: v for k, v in meta.items() if k not in ('topByTottime', 'topByCumtime')})
+    
+    return jsonify({'success': True, 'profiles': profiles}), 200
+
+
+@app.route('/profiles/<profile_id>/<kind>', methods=['GET'])
+def download_profile(profile_id, kind):
+    """Download de um profile: pstats, collapsed ou meta (admin)"""
+    
+    if not is_admin_request():
+        return jsonify({'success': False, 'errorCode': 'FORBIDDEN', 'message': 'Acesso restrito'}), 403
+    
+    if not PROFILE_ID_PATTERN.match(profile_id) or kind not in PROFILE_FILES:
+        return jsonify({'success': False, 'errorCode': 'NOT_FOUND', 'message': 'Profile não encontrado'}), 404
+    
+    filename = profile_id + PROFILE_FILES[kind]
+    if not os.path.exists(os.path.join(PROFILE_DIR, filename)):
+        return jsonify({'success': False, 'errorCode': 'NOT_FOUND', 'message': 'Profile não encontrado'}), 404
+    
+    return send_from_directory(PROFILE_DIR, filename, as_attachment=True)
+
+
 @app.route('/parse-excel', methods=['POST'])
 def parse_excel():
     """
     Endpoint principal - Processa arquivos de folha de pagamento
+    (sob controle de admissão; opcionalmente sob o profiler, ver profile_trigger)
+    """
+    
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return process_payroll_upload()
+    
+    extension = uploaded_file_format(file)
+    cost = estimate_parse_memory(uploaded_file_size(file), extension)
+    
+    rejection = admission.acquire(cost, PARSE_QUEUE_TIMEOUT)
+    if rejection:
+        retry_after = admission.retry_after()
+        print(f'🚦 Upload recusado ({rejection}): {cost / 2**20:.0f}MB estimados, retry em {retry_after}s')
+        return jsonify({
+            'success': False,
+            'errorCode': 'SERVER_BUSY',
+            'reason': rejection,
+            'message': 'Servidor ocupado processando outros arquivos',
+            'suggestion': f'💡 Tente novamente em {retry_after} segundos'
+        }), 429, {'Retry-After': str(retry_after)}
+    
+    started = time.perf_counter()
+    try:
+        file_sha256 = hash_uploaded_file(file)
+        trigger = profile_trigger()
+        
+        if trigger:
+            return run_profiled(lambda: process_payroll_upload(file_sha256), file_sha256, extension, trigger)
+        
+        return process_payroll_upload(file_sha256)
+    finally:
+        admission.release(cost, time.perf_counter() - started)
+
+
+@app.route('/results/<result_id>', methods=['GET'])
+def get_result(result_id):
+    """
+    Resultado recente de /parse-excel (cache em memória, expira após
+    RESULT_CACHE_TTL), com suporte a If-None-Match → 304
+    """
+    
+    body = None
+    with _result_cache_lock:
+        purge_expired_results(time.monotonic())
+        entry = _result_cache.get(result_id)
+        if entry is not None:
+            body = entry[1]
+            _result_cache.move_to_end(result_id)
+    
+    if body is None:
+        return jsonify({'success': False, 'errorCode': 'RESULT_NOT_FOUND', 'message': 'Resultado expirado ou inexistente'}), 404
+    
+    return send_encoded(body, 'private, no-cache')
+
+
+def process_payroll_upload(file_sha256: Optional[str] = None):
+    """
+    Lê o arquivo enviado, estrutura a folha e monta a resposta JSON
     """
     
     if 'file' not in request.files:
@@ -634,118 +1638,87 @@ def parse_excel():
     original_filename = secure_filename(file.filename)
     
     try:
+        # Formato pelo conteúdo, não pelo nome: o arquivo temporário recebe a
+        # extensão real (calamine e openpyxl escolhem o leitor por ela)
+        name_extension = os.path.splitext(original_filename)[1].lower()
+        extension = uploaded_file_format(file)
+        
         # Salvar temporariamente
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(original_filename)[1])
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
         temp_path = temp_file.name
         file.save(temp_path)
         
         file_size = os.path.getsize(temp_path)
-        extension = os.path.splitext(original_filename)[1].lower()
         
         print('\n' + '═' * 80)
         print(f'📄 ARQUIVO: {original_filename}')
         print(f'💾 Tamanho: {file_size:,} bytes')
-        print(f'📝 Extensão: {extension}')
+        print(f'📝 Extensão: {name_extension}')
+        if extension != name_extension:
+            print(f'🔎 Conteúdo detectado: {extension}')
         print('═' * 80)
         
-        # Ler arquivo
-        df = None
+        # Ler arquivo com o engine escolhido (override: campo/parâmetro "engine")
+        requested_engine = request.values.get('engine', '').strip().lower() or None
+        engines = select_reader_engines(extension, requested_engine)
         
-        if extension in ['.csv', '.txt']:
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-            for enc in encodings:
-                try:
-                    df = pd.read_csv(temp_path, encoding=enc, header=None, sep=None, engine='python')
-                    print(f'✅ CSV lido com encoding: {enc}')
-                    break
-                except:
-                    continue
+        if requested_engine and not engines:
+            available = [e.name for e in READER_ENGINES.values() if extension in e.extensions and e.available()]
+            return jsonify({
+                'success': False,
+                'errorCode': 'ENGINE_UNAVAILABLE',
+                'message': f'Engine "{requested_engine}" indisponível para arquivos {extension}',
+                'availableEngines': available
+            }), 400
         
-        elif extension == '.xlsx':
-            print('🔄 Tentando ler XLSX...')
-            
-            # ESTRATÉGIA 1: Tentar ler diretamente com openpyxl
-            try:
-                from openpyxl import load_workbook
-                
-                # Carregar workbook com openpyxl diretamente
-                wb = load_workbook(filename=temp_path, read_only=True, data_only=True)
-                print(f'  📑 Workbook carregado: {wb.sheetnames}')
-                
-                if len(wb.sheetnames) == 0:
-                    return jsonify({
-                        'success': False,
-                        'errorCode': 'EMPTY_SHEETS',
-                        'message': 'Arquivo XLSX sem planilhas',
-                        'suggestion': '💡 Abra no Excel e salve como CSV UTF-8'
-                    }), 400
-                
-                # Pegar primeira sheet ou a sheet "Movimentos"
-                sheet_name = None
-                if 'Movimentos' in wb.sheetnames:
-                    sheet_name = 'Movimentos'
-                else:
-                    sheet_name = wb.sheetnames[0]
-                
-                print(f'  📄 Lendo sheet: {sheet_name}')
-                
-                # Ler com pandas usando a sheet específica
-                df = pd.read_excel(temp_path, sheet_name=sheet_name, engine='openpyxl', header=None)
-                print(f'  ✅ XLSX lido com sucesso: {df.shape[0]} linhas x {df.shape[1]} colunas')
-                
-                wb.close()
-                
-            except Exception as e1:
-                error_msg = str(e1)
-                print(f'  ⚠️  Erro: {error_msg[:200]}')
-                
-                # ESTRATÉGIA 2: Tentar sem especificar sheet
-                try:
-                    print('  🔄 Tentativa 2: leitura sem sheet específica')
-                    df = pd.read_excel(temp_path, engine='openpyxl', header=None)
-                    print(f'  ✅ Sucesso: {df.shape[0]} linhas x {df.shape[1]} colunas')
-                    
-                except Exception as e2:
-                    print(f'  ❌ Falhou: {str(e2)[:200]}')
-                    
-                    # Se falhou tudo, pedir CSV
-                    return jsonify({
-                        'success': False,
-                        'errorCode': 'XLSX_READ_ERROR',
-                        'message': 'Não foi possível ler o arquivo XLSX',
-                        'suggestion': '💡 SOLUÇÃO: No Excel, vá em Arquivo → Salvar Como → CSV UTF-8',
-                        'details': f'Erro 1: {str(e1)[:100]} | Erro 2: {str(e2)[:100]}'
-                    }), 400
-        
-        elif extension == '.xls':
-            # Para XLS, tentar openpyxl primeiro (não precisa de xlrd 1.2.0)
+        raw_data = None
+        engine_used = None
+        errors = []
+        
+        for engine in engines:
+            print(f'🔄 Lendo com engine: {engine.name}')
             try:
-                df = pd.read_excel(temp_path, engine='openpyxl', header=None)
-                print(f'✅ XLS lido com openpyxl')
-            except Exception as e1:
-                # Se falhar, tentar sem engine (Pandas escolhe automaticamente)
-                try:
-                    df = pd.read_excel(temp_path, header=None)
-                    print(f'✅ XLS lido com engine padrão')
-                except Exception as e2:
-                    return jsonify({
-                        'success': False,
-                        'errorCode': 'CORRUPTED_FILE',
-                        'message': 'Arquivo XLS corrompido ou ilegível',
-                        'suggestion': '💡 SOLUÇÃO: Abra no Excel e salve como CSV UTF-8',
-                        'details': f'Tentativas falharam: {str(e1)[:100]} | {str(e2)[:100]}'
-                    }), 400
-        
-        if df is None or df.empty:
+                raw_data = read_spreadsheet(engine, temp_path)
+                engine_used = engine.name
+                width = len(raw_data[0]) if raw_data else 0
+                print(f'  ✅ Lido com {engine.name}: {len(raw_data)} linhas x {width} colunas')
+                break
+            except EmptyWorkbookError:
+                return jsonify({
+                    'success': False,
+                    'errorCode': 'EMPTY_SHEETS',
+                    'message': 'Arquivo sem planilhas',
+                    'suggestion': '💡 Abra no Excel e salve como CSV UTF-8'
+                }), 400
+            except Exception as e:
+                print(f'  ⚠️  {engine.name} falhou: {str(e)[:200]}')
+                errors.append(f'{engine.name}: {str(e)[:100]}')
+        
+        if raw_data is None and errors and extension in ('.xlsx', '.xlsm'):
+            return jsonify({
+                'success': False,
+                'errorCode': 'XLSX_READ_ERROR',
+                'message': 'Não foi possível ler o arquivo XLSX',
+                'suggestion': '💡 SOLUÇÃO: No Excel, vá em Arquivo → Salvar Como → CSV UTF-8',
+                'details': ' | '.join(errors)
+            }), 400
+        
+        if raw_data is None and errors and extension == '.xls':
+            return jsonify({
+                'success': False,
+                'errorCode': 'CORRUPTED_FILE',
+                'message': 'Arquivo XLS corrompido ou ilegível',
+                'suggestion': '💡 SOLUÇÃO: Abra no Excel e salve como CSV UTF-8',
+                'details': f'Tentativas falharam: {" | ".join(errors)}'
+            }), 400
+        
+        if not raw_data:
             return jsonify({
                 'success': False,
                 'errorCode': 'PARSING_FAILED',
                 'message': 'Não foi possível ler o arquivo'
             }), 400
         
-        # Converter para lista
-        raw_data = df.fillna('').astype(str).values.tolist()
-        
         # Estruturar dados
         structured = structure_payroll_data(raw_data)
         
@@ -753,12 +1726,22 @@ def parse_excel():
         print(f'   👥 {structured["summary"]["total_employees"]} funcionários')
         print(f'   📝 {structured["summary"]["total_events"]} eventos')
         
-        return jsonify({
+        payload = {
             'success': True,
             'data': raw_data,
             'structured': structured,
-            'filename': original_filename
-        }), 200
+            'filename': original_filename,
+            'engine': engine_used
+        }
+        
+        # Cache de resultados é opt-in: sem ele, nada da folha fica no servidor
+        result_id = None
+        if RESULT_CACHE_SIZE > 0:
+            # Mesmo arquivo + mesmo nome + mesmo engine → mesmo resultId
+            result_id = hashlib.sha256(f'{file_sha256}:{original_filename}:{engine_used}'.encode()).hexdigest()[:32]
+            payload['resultId'] = result_id
+        
+        return result_response(result_id, payload)
         
     except Exception as e:
         print(f'\n❌ ERRO: {str(e)}')
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Testes do controle de admissão do /parse-excel (server.AdmissionController)
+
+USO:
+    python -m pytest -q test_admission.py
+    python -m unittest test_admission
+"""
+
+import threading
+import time
+import unittest
+
+from server import AdmissionController
+
+
+def wait_until(predicate, timeout: float = 2.0):
+    """Espera a condição (threads em fila) sem depender de sleeps fixos"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('condição não atingida a tempo')
+        time.sleep(0.005)
+
+
+class AcquireInThread(threading.Thread):
+    """acquire() numa thread, guardando o resultado"""
+
+    def __init__(self, controller: AdmissionController, cost: int, timeout: float = 2.0):
+        super().__init__(daemon=True)
+        self.controller = controller
+        self.cost = cost
+        self.timeout = timeout
+        self.result = 'PENDING'
+
+    def run(self):
+        self.result = self.controller.acquire(self.cost, self.timeout)
+
+
+class AdmissionControllerTest(unittest.TestCase):
+
+    def test_fifo_head_of_line(self):
+        controller = AdmissionController(memory_budget=100, max_concurrency=4, max_queue=4)
+        self.assertIsNone(controller.acquire(80, 0))
+
+        big = AcquireInThread(controller, 50)
+        big.start()
+        wait_until(lambda: controller.gauges()['queued'] == 1)
+
+        # Caberia no orçamento (80 + 10 <= 100), mas não passa à frente do primeiro da fila
+        small = AcquireInThread(controller, 10)
+        small.start()
+        wait_until(lambda: controller.gauges()['queued'] == 2)
+        time.sleep(0.05)
+        self.assertEqual(small.result, 'PENDING')
+        self.assertEqual(controller.gauges()['active'], 1)
+
+        controller.release(80, 0.1)
+        big.join(2)
+        small.join(2)
+
+        self.assertIsNone(big.result)
+        self.assertIsNone(small.result)
+        gauges = controller.gauges()
+        self.assertEqual((gauges['active'], gauges['reservedBytes'], gauges['queued']), (2, 60, 0))
+
+    def test_oversized_job_runs_alone(self):
+        controller = AdmissionController(memory_budget=100, max_concurrency=4, max_queue=4)
+
+        # Sozinho, é admitido mesmo acima do orçamento (reserva limitada ao orçamento)
+        self.assertIsNone(controller.acquire(500, 0))
+        self.assertEqual(controller.gauges()['reservedBytes'], 100)
+        self.assertEqual(controller.acquire(1, 0.05), 'QUEUE_TIMEOUT')
+        controller.release(500, 0.1)
+
+        # Com outro job ativo, espera até ficar sozinho
+        self.assertIsNone(controller.acquire(10, 0))
+        oversized = AcquireInThread(controller, 500)
+        oversized.start()
+        wait_until(lambda: controller.gauges()['queued'] == 1)
+        self.assertEqual(oversized.result, 'PENDING')
+
+        controller.release(10, 0.1)
+        oversized.join(2)
+        self.assertIsNone(oversized.result)
+        self.assertEqual(controller.gauges()['active'], 1)
+
+    def test_queue_timeout(self):
+        controller = AdmissionController(memory_budget=100, max_concurrency=1, max_queue=4)
+        self.assertIsNone(controller.acquire(10, 0))
+
+        started = time.monotonic()
+        self.assertEqual(controller.acquire(10, 0.1), 'QUEUE_TIMEOUT')
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+        gauges = controller.gauges()
+        self.assertEqual((gauges['queued'], gauges['timedOutTotal'], gauges['active']), (0, 1, 1))
+
+    def test_queue_full(self):
+        controller = AdmissionController(memory_budget=100, max_concurrency=1, max_queue=1)
+        self.assertIsNone(controller.acquire(10, 0))
+
+        waiting = AcquireInThread(controller, 10)
+        waiting.start()
+        wait_until(lambda: controller.gauges()['queued'] == 1)
+
+        # Fila cheia: recusa imediata, sem esperar o timeout
+        started = time.monotonic()
+        self.assertEqual(controller.acquire(10, 5), 'QUEUE_FULL')
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(controller.gauges()['rejectedTotal'], 1)
+
+        controller.release(10, 0.1)
+        waiting.join(2)
+        self.assertIsNone(waiting.result)
+
+
+if __name__ == '__main__':
+    unittest.main()
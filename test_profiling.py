@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Testes do profiling sob demanda do /parse-excel (server.run_profiled)
+
+USO:
+    python -m pytest -q test_profiling.py
+    python -m unittest test_profiling
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from payroll_generator import generate_payroll_rows, write_payroll
+import server
+
+ADMIN_HEADERS = {'X-Admin-Token': 's3cret'}
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workdir.cleanup)
+        self.profile_dir = os.path.join(self.workdir.name, 'profiles')
+
+        for name, value in (('ADMIN_TOKEN', 's3cret'), ('PROFILE_DIR', self.profile_dir), ('PROFILE_SAMPLE_RATE', 0.0)):
+            patcher = mock.patch.object(server, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.path = os.path.join(self.workdir.name, 'folha.xlsx')
+        write_payroll(generate_payroll_rows(employees=5), self.path)
+        self.client = server.app.test_client()
+
+    def upload(self, headers=None):
+        """POST /parse-excel sem os prints de depuração do servidor"""
+        with open(self.path, 'rb') as f, contextlib.redirect_stdout(io.StringIO()):
+            return self.client.post('/parse-excel', data={'file': (f, 'folha.xlsx')}, headers=headers or {})
+
+    def test_forced_profile_writes_files(self):
+        response = self.upload({**ADMIN_HEADERS, 'X-Profile': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['success'])
+
+        profile_ids = server.stored_profile_ids()
+        self.assertEqual(len(profile_ids), 1)
+        for suffix in server.PROFILE_FILES.values():
+            self.assertTrue(os.path.exists(os.path.join(self.profile_dir, profile_ids[0] + suffix)), suffix)
+
+    def test_upload_without_token_is_not_profiled(self):
+        response = self.upload({'X-Profile': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(server.stored_profile_ids(), [])
+
+    def test_profile_endpoints_require_token(self):
+        self.upload({**ADMIN_HEADERS, 'X-Profile': '1'})
+        profile_id = server.stored_profile_ids()[0]
+
+        for url in ('/profiles', f'/profiles/{profile_id}/collapsed'):
+            self.assertEqual(self.client.get(url).status_code, 403, url)
+            self.assertEqual(self.client.get(url, headers={'X-Admin-Token': 'errado'}).status_code, 403, url)
+
+        listing = self.client.get('/profiles', headers=ADMIN_HEADERS)
+        self.assertEqual(listing.status_code, 200)
+        self.assertEqual([p['id'] for p in listing.json['profiles']], [profile_id])
+        self.assertEqual(listing.json['profiles'][0]['trigger'], 'admin')
+
+        collapsed = self.client.get(f'/profiles/{profile_id}/collapsed', headers=ADMIN_HEADERS)
+        self.assertEqual(collapsed.status_code, 200)
+        self.assertIn(b'process_payroll_upload', collapsed.data)
+
+    def test_unknown_profile_returns_404(self):
+        self.upload({**ADMIN_HEADERS, 'X-Profile': '1'})
+        profile_id = server.stored_profile_ids()[0]
+
+        # Fora do padrão de ID, tipo desconhecido e ID válido inexistente
+        for url in ('/profiles/..%2F..%2Fetc%2Fpasswd/collapsed', '/profiles/nao-existe/collapsed',
+                    f'/profiles/{profile_id}/desconhecido', '/profiles/1_0000000000000000/collapsed'):
+            self.assertEqual(self.client.get(url, headers=ADMIN_HEADERS).status_code, 404, url)
+
+
+if __name__ == '__main__':
+    unittest.main()